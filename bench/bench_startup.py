@@ -0,0 +1,119 @@
+#-*- coding: utf-8 -*-
+
+'''
+Startup-time benchmark.
+
+Measures, in fresh interpreters, the time to import LearnEnglishBySubtitle and
+the time to align a tiny SRT pair through doWork, both net of the bare
+interpreter start. Exits with 1 when a median exceeds its budget, or when the
+import has side effects (a log file, or parser modules loaded eagerly).
+
+	python bench/bench_startup.py [runs]
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import timeit
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+RUNS = 15
+
+# seconds, net of the interpreter start
+IMPORT_BUDGET = 0.04
+ALIGN_BUDGET = 0.08
+
+# must not be loaded by importing LearnEnglishBySubtitle
+LAZY_MODULES = ('srt_github', 'smi2srt_github', 'chardet', 'SrtReader', 'SmiReader', 'VttReader', 'AssReader', 'AlignmentCache')
+
+TINY_FIRST = u'''1
+00:00:01,000 --> 00:00:02,500
+Hello there.
+
+2
+00:00:03,000 --> 00:00:04,000
+How are you?
+'''
+
+TINY_SECOND = u'''1
+00:00:01,100 --> 00:00:02,400
+안녕하세요.
+
+2
+00:00:03,050 --> 00:00:04,100
+어떻게 지내요?
+'''
+
+
+def runPython(_code, _cwd):
+	start = timeit.default_timer()
+	subprocess.check_call([sys.executable, '-c', _code], cwd=_cwd)
+	return timeit.default_timer() - start
+
+
+def median(_values):
+	values = sorted(_values)
+	return values[len(values) // 2]
+
+
+def measure(_code, _cwd, _runs):
+	return median([runPython(_code, _cwd) for _ in range(_runs)])
+
+
+def checkSideEffects(_work_dir):
+	code = (
+		"import sys\n"
+		"sys.path.insert(0, %r)\n"
+		"import LearnEnglishBySubtitle\n"
+		"sys.stdout.write(','.join(m for m in %r if m in sys.modules))\n"
+	) % (os.path.abspath(SRC_DIR), LAZY_MODULES)
+	loaded = subprocess.check_output([sys.executable, '-c', code], cwd=_work_dir).decode('ascii')
+
+	errors = []
+	if loaded:
+		errors.append('import loads ' + loaded)
+	if os.listdir(_work_dir):
+		errors.append('import creates ' + ', '.join(os.listdir(_work_dir)))
+	return errors
+
+
+def main(_runs):
+	work_dir = tempfile.mkdtemp()
+	data_dir = tempfile.mkdtemp()
+	try:
+		errors = checkSideEffects(work_dir)
+
+		first = os.path.join(data_dir, 'tiny.en.srt')
+		second = os.path.join(data_dir, 'tiny.ko.srt')
+		output = os.path.join(data_dir, 'tiny_output_.srt')
+		for filename, text in ((first, TINY_FIRST), (second, TINY_SECOND)):
+			with open(filename, 'wb') as f:
+				f.write(text.encode('utf-8'))
+
+		src_dir = os.path.abspath(SRC_DIR)
+		baseline = measure("pass", work_dir, _runs)
+		import_time = measure("import sys; sys.path.insert(0, %r); import LearnEnglishBySubtitle" % src_dir, work_dir, _runs) - baseline
+		align_time = measure("import sys; sys.path.insert(0, %r); import LearnEnglishBySubtitle; LearnEnglishBySubtitle.doWork(%r, %r, %r)" % (src_dir, first, second, output), work_dir, _runs) - baseline
+
+		print("interpreter start : %.4f s" % baseline)
+		print("import            : %.4f s (budget %.4f s)" % (import_time, IMPORT_BUDGET))
+		print("align tiny pair   : %.4f s (budget %.4f s)" % (align_time, ALIGN_BUDGET))
+
+		if import_time > IMPORT_BUDGET:
+			errors.append('import time %.4f s > %.4f s' % (import_time, IMPORT_BUDGET))
+		if align_time > ALIGN_BUDGET:
+			errors.append('align time %.4f s > %.4f s' % (align_time, ALIGN_BUDGET))
+	finally:
+		shutil.rmtree(work_dir)
+		shutil.rmtree(data_dir)
+
+	for error in errors:
+		print("REGRESSION : " + error)
+	return 1 if errors else 0
+
+
+if __name__=="__main__":
+	runs = int(sys.argv[1]) if len(sys.argv) >= 2 else RUNS
+	sys.exit(main(runs))
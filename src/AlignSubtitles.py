@@ -0,0 +1,193 @@
+#-*- coding: utf-8 -*-
+
+'''
+Banded dynamic-programming alignment of two subtitle tracks.
+
+Strict time overlap drops or mismatches cues whenever one track splits or
+merges sentences differently or has small timing jitter. This module finds
+the cheapest monotonic mapping of 1:1 / 1:2 / 2:1 cue groups (plus skipped
+cues) in the style of Gale-Church, scoring each group by timing distance and
+length ratio. Only cells inside a band of `_band_width` cues around the time
+diagonal are evaluated, so the run time is O((N+M) * w) instead of O(N * M).
+'''
+
+import math
+import logging
+from bisect import bisect_left
+
+# default half width of the band (in cues) around the time diagonal
+BAND_WIDTH = 8
+
+# cost of leaving a single cue unmatched (in seconds of timing distance)
+SKIP_COST = 2.0
+# extra cost of merging two cues into one group (1:2 or 2:1)
+MERGE_COST = 0.3
+# weight of the length ratio term
+LENGTH_WEIGHT = 0.5
+
+# (first cues, second cues) consumed by each move
+MATCH_MOVES = ((1, 1), (1, 2), (2, 1))
+SKIP_MOVES = ((1, 0), (0, 1))
+
+
+def deltatime_2_timestamp(_deltatime):
+	return _deltatime.total_seconds()
+
+
+def textOf(_contents):
+	if _contents is None:
+		return u''
+	if isinstance(_contents, unicode):
+		return _contents
+	return _contents.decode('utf-8', 'replace')
+
+
+def cuesOf(_subs):
+	# (start, end, text) of each subtitle, in seconds
+	return [(deltatime_2_timestamp(sub.start_timedelta_),
+			deltatime_2_timestamp(sub.end_timedelta_),
+			textOf(sub.contents_)) for sub in _subs]
+
+
+def lengthRatio(_first_cues, _second_cues):
+	# average length ratio of the two tracks (e.g. English is longer than Korean)
+	f_len = sum(len(cue[2]) for cue in _first_cues) + 1
+	s_len = sum(len(cue[2]) for cue in _second_cues) + 1
+	return float(f_len) / s_len
+
+
+def makeBand(_first_cues, _second_cues, _band_width):
+	'''
+	Column range [lo, hi] of every DP row.
+
+	Row i is centred on the number of second cues starting before the i-th first
+	cue. Ranges are kept monotonic and overlapping so every row stays reachable.
+	'''
+	n = len(_first_cues)
+	m = len(_second_cues)
+	s_starts = [cue[0] for cue in _second_cues]
+
+	band = []
+	prev_lo, prev_hi = 0, 0
+	for i in range(n + 1):
+		if i == n:
+			center = m
+		else:
+			center = bisect_left(s_starts, _first_cues[i][0])
+		lo = max(prev_lo, center - _band_width, 0)
+		hi = min(max(prev_hi, center + _band_width), m)
+		if i == 0:
+			lo = 0
+		if i == n:
+			hi = m
+		# must overlap the previous row, otherwise the band is disconnected
+		lo = min(lo, prev_hi)
+		band.append((lo, hi))
+		prev_lo, prev_hi = lo, hi
+	return band
+
+
+def groupOf(_cues, _begin, _end):
+	start = _cues[_begin][0]
+	end = _cues[_end - 1][1]
+	text = u'\n'.join(cue[2] for cue in _cues[_begin:_end])
+	return start, end, text
+
+
+def matchCost(_f_group, _s_group, _ratio):
+	time_cost = abs(_f_group[0] - _s_group[0]) + abs(_f_group[1] - _s_group[1])
+	f_len = len(_f_group[2]) + 1
+	s_len = (len(_s_group[2]) + 1) * _ratio
+	length_cost = LENGTH_WEIGHT * abs(math.log(f_len / s_len))
+	return time_cost + length_cost
+
+
+def makeMatchedRow(_f_group, _s_group):
+	f_start, f_end, f_contents = _f_group
+	s_start, s_end, s_contents = _s_group
+
+	l_ts = f_start if f_start >= s_start else s_start
+	r_ts = f_end if f_end <= s_end else s_end
+	if l_ts >= r_ts:
+		# jittered cues that do not overlap : cover both
+		l_ts = f_start if f_start <= s_start else s_start
+		r_ts = f_end if f_end >= s_end else s_end
+
+	return {"f_start": f_start,
+			"f_end": f_end,
+			"s_start": s_start,
+			"s_end": s_end,
+			"left_ts": l_ts,
+			"right_ts": r_ts,
+			"f_contents": f_contents.encode('utf-8'),
+			"s_contents": s_contents.encode('utf-8')
+			}
+
+
+def alignBanded(_first_subs, _second_subs, _band_width=BAND_WIDTH):
+	'''
+	Align two lists of subtitles (as parsed by ExtractInfoAtSubtitles) and
+	return the matched rows in the same format as doWork's overlap matching.
+	'''
+	first_cues = cuesOf(_first_subs)
+	second_cues = cuesOf(_second_subs)
+	n = len(first_cues)
+	m = len(second_cues)
+	if n == 0 or m == 0:
+		return []
+
+	ratio = lengthRatio(first_cues, second_cues)
+	band = makeBand(first_cues, second_cues, _band_width)
+
+	# cost[i][j] / back[i][j] only hold the columns inside the band of row i
+	cost = [dict() for _ in range(n + 1)]
+	back = [dict() for _ in range(n + 1)]
+	cost[0][0] = 0.0
+	back[0][0] = None
+
+	for i in range(n + 1):
+		lo, hi = band[i]
+		row_cost = cost[i]
+		row_back = back[i]
+		for j in range(lo, hi + 1):
+			if i == 0 and j == 0:
+				continue
+			best = None
+			best_move = None
+			for di, dj in SKIP_MOVES + MATCH_MOVES:
+				pi = i - di
+				pj = j - dj
+				if pi < 0 or pj < 0:
+					continue
+				prev = cost[pi].get(pj)
+				if prev is None:
+					continue
+				if di == 0 or dj == 0:
+					step = SKIP_COST
+				else:
+					step = matchCost(groupOf(first_cues, pi, i),
+						groupOf(second_cues, pj, j), ratio)
+					if di + dj > 2:
+						step += MERGE_COST
+				if best is None or prev + step < best:
+					best = prev + step
+					best_move = (di, dj)
+			if best is not None:
+				row_cost[j] = best
+				row_back[j] = best_move
+
+	# trace back from (n, m)
+	all_matched_list = []
+	i, j = n, m
+	while i > 0 or j > 0:
+		di, dj = back[i][j]
+		if di > 0 and dj > 0:
+			all_matched_list.append(makeMatchedRow(
+				groupOf(first_cues, i - di, i),
+				groupOf(second_cues, j - dj, j)))
+		i -= di
+		j -= dj
+	all_matched_list.reverse()
+
+	logging.info("[BANDED] : {%d} x {%d} cues, band {%d}, cost {%.3f}, matched {%d}" % (n, m, _band_width, cost[n][m], len(all_matched_list)))
+	return all_matched_list
@@ -0,0 +1,124 @@
+#-*- coding: utf-8 -*-
+
+'''
+Content-addressed cache of alignment results.
+
+An entry is keyed by the hashes of both input files' contents plus the
+alignment parameters, and stores the finished (written) SRT output. Entries
+are evicted least recently used first once the cache grows past `max_size`
+bytes; the modification time of an entry is its last use.
+'''
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'LearnEnglishBySubtitle')
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+CACHE_EXTENSION = '.srt'
+# bump when the matchers or the output format change, so stale entries are not served
+CACHE_VERSION = 2
+READ_CHUNK = 1024 * 1024
+
+
+def hashOfFile(_filename):
+	sha = hashlib.sha1()
+	with open(_filename, 'rb') as f:
+		while True:
+			chunk = f.read(READ_CHUNK)
+			if not chunk:
+				break
+			sha.update(chunk)
+	return sha.hexdigest()
+
+
+class AlignmentCache:
+	def __init__(self, _cache_dir=DEFAULT_CACHE_DIR, _max_size=DEFAULT_MAX_SIZE, _bypass=False):
+		self.cache_dir_ = _cache_dir
+		self.max_size_ = _max_size
+		self.bypass_ = _bypass
+		self.hits_ = 0
+		self.misses_ = 0
+		if not os.path.isdir(self.cache_dir_):
+			os.makedirs(self.cache_dir_)
+
+	def makeKey(self, _first_subtitle, _second_subtitle, *_params):
+		sha = hashlib.sha1()
+		sha.update(('v%d\0' % CACHE_VERSION).encode('ascii'))
+		sha.update(hashOfFile(_first_subtitle).encode('ascii'))
+		sha.update(hashOfFile(_second_subtitle).encode('ascii'))
+		for param in _params:
+			sha.update(('\0' + repr(param)).encode('utf-8'))
+		return sha.hexdigest()
+
+	def pathOf(self, _key):
+		return os.path.join(self.cache_dir_, _key + CACHE_EXTENSION)
+
+	def lookup(self, _key, _output_filename):
+		'''
+		Stream a cached result into _output_filename.
+		Returns False (and counts a miss) when there is no entry or the cache is bypassed.
+		'''
+		if self.bypass_:
+			return False
+
+		cache_path = self.pathOf(_key)
+		try:
+			with open(cache_path, 'rb') as src:
+				with open(_output_filename, 'wb') as dst:
+					shutil.copyfileobj(src, dst, READ_CHUNK)
+		except (IOError, OSError):
+			self.misses_ += 1
+			logging.info("[CACHE] miss : " + _key)
+			return False
+
+		# mark as recently used
+		now = time.time()
+		try:
+			os.utime(cache_path, (now, now))
+		except OSError:
+			pass
+		self.hits_ += 1
+		logging.info("[CACHE] hit : " + _key)
+		return True
+
+	def store(self, _key, _output_filename):
+		if self.bypass_:
+			return
+
+		cache_path = self.pathOf(_key)
+		temp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+		shutil.copyfile(_output_filename, temp_path)
+		os.rename(temp_path, cache_path)
+		self.evict()
+
+	def evict(self):
+		entries = []
+		total_size = 0
+		for name in os.listdir(self.cache_dir_):
+			if not name.endswith(CACHE_EXTENSION):
+				continue
+			path = os.path.join(self.cache_dir_, name)
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			entries.append((st.st_mtime, st.st_size, path))
+			total_size += st.st_size
+
+		# least recently used first
+		entries.sort()
+		for mtime, size, path in entries:
+			if total_size <= self.max_size_:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total_size -= size
+			logging.info("[CACHE] evict : " + path)
+
+	def stats(self):
+		return {"hits": self.hits_, "misses": self.misses_}
@@ -0,0 +1,75 @@
+#-*- coding: utf-8 -*-
+
+'''
+ASS / SSA reader.
+
+Only the Dialogue lines of the [Events] section are read, in the field order
+given by its Format line. Override blocks ({\\...}) are dropped, \\N and \\n
+become line breaks and \\h a space.
+'''
+
+import re
+import codecs
+
+from srt_github import make_a_subtitle
+
+RGX_ASS_OVERRIDE = re.compile(r'\{[^}]*\}')
+RGX_ASS_TIMESTAMP = re.compile(r'^(\d+):(\d{1,2}):(\d{1,2})[.:](\d{1,2})$')
+DEFAULT_FORMAT = [u'Layer', u'Start', u'End', u'Style', u'Name', u'MarginL', u'MarginR', u'MarginV', u'Effect', u'Text']
+
+
+def ass_timestamp_to_srt(_ts):
+	# "h:mm:ss.cc" -> "hh:mm:ss,mmm"
+	m = RGX_ASS_TIMESTAMP.match(_ts.strip())
+	if not m:
+		raise ValueError('Expected ASS timestamp h:mm:ss.cc, but got {}'.format(_ts))
+	hrs, mins, secs, centis = m.groups()
+	return '%02d:%02d:%02d,%03d' % (int(hrs), int(mins), int(secs), int(centis.ljust(2, '0')) * 10)
+
+
+def cleanText(_text):
+	text = RGX_ASS_OVERRIDE.sub(u'', _text)
+	text = text.replace(u'\\N', u'\n').replace(u'\\n', u'\n').replace(u'\\h', u' ')
+	return text.strip()
+
+
+def parseAss(_text):
+	subs = []
+	in_events = False
+	fields = DEFAULT_FORMAT
+	for line in _text.splitlines():
+		line = line.strip()
+		if line.startswith(u'['):
+			in_events = (line.lower() == u'[events]')
+			continue
+		if not in_events:
+			continue
+
+		key, sep, value = line.partition(u':')
+		if not sep:
+			continue
+		key = key.strip().lower()
+		if key == u'format':
+			fields = [field.strip() for field in value.split(u',')]
+		elif key == u'dialogue':
+			values = value.strip().split(u',', len(fields) - 1)
+			if len(values) != len(fields):
+				continue
+			event = dict(zip(fields, values))
+			contents = cleanText(event.get(u'Text', u''))
+			if not contents:
+				continue
+			subs.append(make_a_subtitle(len(subs) + 1,
+				ass_timestamp_to_srt(event[u'Start']),
+				contents,
+				ass_timestamp_to_srt(event[u'End'])
+				))
+
+	# Dialogue lines are not required to be in time order
+	subs.sort(key=lambda sub: (sub.start_timedelta_, sub.end_timedelta_))
+	return subs
+
+
+def readAss(_str_subtitle):
+	with codecs.open(_str_subtitle, 'r', encoding="utf-8-sig") as f :
+		return parseAss(f.read())
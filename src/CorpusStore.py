@@ -0,0 +1,218 @@
+#-*- coding: utf-8 -*-
+
+'''
+Shared-memory store of parsed subtitle tracks.
+
+Tracks are parsed once and packed into a single named shared memory segment:
+
+	header length (8 bytes) | JSON header | start ms (int64 x N) | end ms (int64 x N)
+	| text offsets (int64 x N+1) | UTF-8 text blob
+
+Worker processes attach to the segment by name and read cues straight out of
+the shared buffer, without re-parsing files or pickling Subtitle objects.
+multiprocessing.shared_memory is used when its segments can be attached
+untracked (Python 3.13+), otherwise the segment is a memory mapped file under
+/dev/shm.
+'''
+
+import os
+import json
+import mmap
+import atexit
+import struct
+import logging
+import tempfile
+
+try:
+	from multiprocessing import shared_memory
+except ImportError:
+	shared_memory = None
+
+import ExtractInfoAtSubtitles
+
+INT64 = struct.Struct('<q')
+HEADER_LENGTH = INT64.size
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def timedelta_2_ms(_timedelta):
+	return (_timedelta.days * 86400 + _timedelta.seconds) * 1000 + _timedelta.microseconds // 1000
+
+
+def textOf(_contents):
+	if _contents is None:
+		return b''
+	if isinstance(_contents, bytes):
+		return _contents
+	return _contents.encode('utf-8')
+
+
+class FileSegment:
+	'''
+	Named shared memory backed by a memory mapped file (fallback for
+	multiprocessing.shared_memory.SharedMemory, with the same interface).
+	'''
+	def __init__(self, name, create=False, size=0):
+		self.name = name
+		self.path_ = os.path.join(SHM_DIR, name)
+		if create:
+			fd = os.open(self.path_, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+			os.ftruncate(fd, size)
+		else:
+			fd = os.open(self.path_, os.O_RDWR)
+			size = os.fstat(fd).st_size
+		try:
+			self.buf = mmap.mmap(fd, size)
+		finally:
+			os.close(fd)
+		self.size = size
+
+	def close(self):
+		self.buf.close()
+
+	def unlink(self):
+		os.unlink(self.path_)
+
+
+def openSegment(_name, _create=False, _size=0):
+	if shared_memory is not None:
+		try:
+			# only the creating process tracks (and eventually unlinks) the segment
+			return shared_memory.SharedMemory(name=_name, create=_create, size=_size, track=_create)
+		except TypeError:
+			# before Python 3.13 an attaching process would register the segment
+			# with its own resource tracker, which unlinks it when the worker exits
+			pass
+	return FileSegment(_name, _create, _size)
+
+
+class CorpusStore:
+	def __init__(self, _segment, _is_owner):
+		self.segment_ = _segment
+		self.is_owner_ = _is_owner
+		self.closed_ = False
+
+		buf = self.segment_.buf
+		header_length = INT64.unpack_from(buf, 0)[0]
+		self.header_ = json.loads(bytes(buf[HEADER_LENGTH:HEADER_LENGTH + header_length]).decode('utf-8'))
+		self.n_cues_ = self.header_['n_cues']
+		self.starts_offset_ = self.header_['starts']
+		self.ends_offset_ = self.header_['ends']
+		self.text_offsets_offset_ = self.header_['text_offsets']
+		self.text_offset_ = self.header_['text']
+		# track name -> [first cue, last cue + 1]
+		self.tracks_ = dict((name, (begin, end)) for name, begin, end in self.header_['tracks'])
+
+		if self.is_owner_:
+			atexit.register(self.unlink)
+
+	@staticmethod
+	def create(_name, _tracks):
+		'''
+		_tracks : [(track name, [Subtitle])]
+		'''
+		starts = []
+		ends = []
+		texts = []
+		tracks = []
+		for track_name, subs in _tracks:
+			begin = len(starts)
+			for sub in subs:
+				starts.append(timedelta_2_ms(sub.start_timedelta_))
+				ends.append(timedelta_2_ms(sub.end_timedelta_))
+				texts.append(textOf(sub.contents_))
+			tracks.append((track_name, begin, len(starts)))
+
+		n_cues = len(starts)
+		text_offsets = [0]
+		for text in texts:
+			text_offsets.append(text_offsets[-1] + len(text))
+
+		# the header holds its own offsets, so size it with placeholders first
+		header = {'n_cues': n_cues, 'tracks': tracks, 'starts': 0, 'ends': 0, 'text_offsets': 0, 'text': 0}
+		column_size = INT64.size * n_cues
+		header_length = len(json.dumps(header)) + 64
+		header['starts'] = HEADER_LENGTH + header_length
+		header['ends'] = header['starts'] + column_size
+		header['text_offsets'] = header['ends'] + column_size
+		header['text'] = header['text_offsets'] + INT64.size * (n_cues + 1)
+		total_size = header['text'] + text_offsets[-1]
+
+		segment = openSegment(_name, True, max(total_size, 1))
+		buf = segment.buf
+		header_bytes = json.dumps(header).encode('utf-8')
+		INT64.pack_into(buf, 0, len(header_bytes))
+		buf[HEADER_LENGTH:HEADER_LENGTH + len(header_bytes)] = header_bytes
+		column = struct.Struct('<%dq' % n_cues)
+		column.pack_into(buf, header['starts'], *starts)
+		column.pack_into(buf, header['ends'], *ends)
+		struct.Struct('<%dq' % (n_cues + 1)).pack_into(buf, header['text_offsets'], *text_offsets)
+		buf[header['text']:total_size] = b''.join(texts)
+
+		logging.info("[CORPUS] created %s : %d tracks, %d cues, %d bytes" % (_name, len(tracks), n_cues, total_size))
+		return CorpusStore(segment, True)
+
+	@staticmethod
+	def fromFiles(_name, _subtitle_filenames):
+		tracks = []
+		for filename in _subtitle_filenames:
+			tracks.append((filename, ExtractInfoAtSubtitles.InfoOfSubtitle(filename).subs_))
+		return CorpusStore.create(_name, tracks)
+
+	@staticmethod
+	def attach(_name):
+		return CorpusStore(openSegment(_name), False)
+
+	def name(self):
+		return self.segment_.name
+
+	def trackNames(self):
+		return [track[0] for track in self.header_['tracks']]
+
+	def __len__(self):
+		return self.n_cues_
+
+	def cue(self, _idx):
+		'''
+		(start ms, end ms, text) of the _idx-th cue of the store
+		'''
+		buf = self.segment_.buf
+		start = INT64.unpack_from(buf, self.starts_offset_ + _idx * INT64.size)[0]
+		end = INT64.unpack_from(buf, self.ends_offset_ + _idx * INT64.size)[0]
+		text_begin = INT64.unpack_from(buf, self.text_offsets_offset_ + _idx * INT64.size)[0]
+		text_end = INT64.unpack_from(buf, self.text_offsets_offset_ + (_idx + 1) * INT64.size)[0]
+		text = bytes(buf[self.text_offset_ + text_begin:self.text_offset_ + text_end]).decode('utf-8')
+		return start, end, text
+
+	def iterCues(self, _track_name):
+		begin, end = self.tracks_[_track_name]
+		for idx in range(begin, end):
+			yield self.cue(idx)
+
+	def close(self):
+		if self.closed_:
+			return
+		self.closed_ = True
+		self.segment_.close()
+
+	def unlink(self):
+		'''
+		Close and remove the segment; only the creating process does it.
+		'''
+		self.close()
+		if not self.is_owner_:
+			return
+		self.is_owner_ = False
+		try:
+			self.segment_.unlink()
+		except OSError:
+			pass
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if self.is_owner_:
+			self.unlink()
+		else:
+			self.close()
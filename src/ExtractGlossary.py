@@ -0,0 +1,202 @@
+#-*- coding: utf-8 -*-
+
+'''
+Korean-English glossary mining from aligned subtitle pairs.
+
+Every aligned pair is one "sentence" of a parallel corpus. The English side is
+tokenized into words and the Korean side into eojeol (space separated words)
+or syllables. Term occurrences are accumulated as COO triples, converted to
+sparse pair x term CSR matrices E and K, and the co-occurrence counts of every
+(English, Korean) term pair come from one sparse product C = E^T K. Candidate
+translations are ranked by Dice coefficient and PMI.
+'''
+
+import re
+import sys
+import codecs
+import logging
+import multiprocessing
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+import ExtractInfoAtSubtitles
+import AlignSubtitles
+import LearnEnglishBySubtitle
+
+KOREAN_EOJEOL = "eojeol"
+KOREAN_SYLLABLE = "syllable"
+
+MIN_COUNT = 3
+TOP_K = 5
+WORKERS = multiprocessing.cpu_count()
+
+RGX_TAG = re.compile(r'<[^>]*>')
+RGX_ENGLISH_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+RGX_HANGUL_WORD = re.compile(u'[가-힣]+')
+RGX_HANGUL_SYLLABLE = re.compile(u'[가-힣]')
+
+
+def tokenizeEnglish(_text):
+	return set(RGX_ENGLISH_WORD.findall(RGX_TAG.sub(' ', _text).lower()))
+
+
+def tokenizeKorean(_text, _mode=KOREAN_EOJEOL):
+	text = RGX_TAG.sub(' ', _text)
+	if _mode == KOREAN_SYLLABLE:
+		return set(RGX_HANGUL_SYLLABLE.findall(text))
+	return set(RGX_HANGUL_WORD.findall(text))
+
+
+def tokenizeFilm(_args):
+	'''
+	Parse and align one (English, Korean) subtitle pair.
+	Returns [(english tokens, korean tokens)] of every aligned pair.
+	'''
+	first_subtitle, second_subtitle, korean_mode = _args
+	try:
+		first_sub = ExtractInfoAtSubtitles.InfoOfSubtitle(first_subtitle)
+		second_sub = ExtractInfoAtSubtitles.InfoOfSubtitle(second_subtitle)
+	except Exception:
+		logging.exception("[GLOSSARY] cannot read : " + first_subtitle + ", " + second_subtitle)
+		return []
+
+	tokens = []
+	for row in AlignSubtitles.alignBanded(first_sub.subs_, second_sub.subs_):
+		en = tokenizeEnglish(row['f_contents'].decode('utf-8'))
+		ko = tokenizeKorean(row['s_contents'].decode('utf-8'), korean_mode)
+		if en and ko:
+			tokens.append((en, ko))
+	return tokens
+
+
+class GlossaryBuilder:
+	def __init__(self):
+		self.en_vocab_ = {}
+		self.ko_vocab_ = {}
+		self.n_pairs_ = 0
+		# COO triples (pair, term) of each side; values are always 1
+		self.en_rows_ = array('i')
+		self.en_cols_ = array('i')
+		self.ko_rows_ = array('i')
+		self.ko_cols_ = array('i')
+
+	def addPair(self, _en_tokens, _ko_tokens):
+		row = self.n_pairs_
+		for token in _en_tokens:
+			self.en_rows_.append(row)
+			self.en_cols_.append(self.en_vocab_.setdefault(token, len(self.en_vocab_)))
+		for token in _ko_tokens:
+			self.ko_rows_.append(row)
+			self.ko_cols_.append(self.ko_vocab_.setdefault(token, len(self.ko_vocab_)))
+		self.n_pairs_ += 1
+
+	def matrixOf(self, _rows, _cols, _n_terms):
+		rows = np.frombuffer(_rows, dtype=np.int32)
+		cols = np.frombuffer(_cols, dtype=np.int32)
+		data = np.ones(len(rows), dtype=np.float32)
+		return sp.coo_matrix((data, (rows, cols)), shape=(self.n_pairs_, _n_terms)).tocsr()
+
+	def build(self, _min_count=MIN_COUNT, _top_k=TOP_K):
+		'''
+		Returns [(english, korean, count, dice, pmi)] sorted by English term
+		frequency, then by Dice coefficient.
+		'''
+		if self.n_pairs_ == 0:
+			return []
+
+		en_matrix = self.matrixOf(self.en_rows_, self.en_cols_, len(self.en_vocab_))
+		ko_matrix = self.matrixOf(self.ko_rows_, self.ko_cols_, len(self.ko_vocab_))
+		en_count = np.asarray(en_matrix.sum(axis=0)).ravel()
+		ko_count = np.asarray(ko_matrix.sum(axis=0)).ravel()
+
+		# drop rare terms before the product
+		en_keep = np.flatnonzero(en_count >= _min_count)
+		ko_keep = np.flatnonzero(ko_count >= _min_count)
+		en_matrix = en_matrix[:, en_keep]
+		ko_matrix = ko_matrix[:, ko_keep]
+
+		cooc = (en_matrix.T.tocsr() * ko_matrix).tocoo()
+		mask = cooc.data >= _min_count
+		en_ids = en_keep[cooc.row[mask]]
+		ko_ids = ko_keep[cooc.col[mask]]
+		counts = cooc.data[mask].astype(np.float64)
+
+		fe = en_count[en_ids].astype(np.float64)
+		fk = ko_count[ko_ids].astype(np.float64)
+		dice = 2.0 * counts / (fe + fk)
+		pmi = np.log(counts * self.n_pairs_ / (fe * fk))
+
+		# by English term, then by Dice (descending)
+		order = np.lexsort((-dice, en_ids))
+		en_words = dict((v, k) for k, v in self.en_vocab_.items())
+		ko_words = dict((v, k) for k, v in self.ko_vocab_.items())
+
+		candidates = {}
+		for idx in order:
+			en_id = en_ids[idx]
+			ranked = candidates.setdefault(en_id, [])
+			if len(ranked) < _top_k:
+				ranked.append((en_words[en_id], ko_words[ko_ids[idx]], int(counts[idx]), float(dice[idx]), float(pmi[idx])))
+
+		glossary = []
+		for en_id in sorted(candidates, key=lambda x: -en_count[x]):
+			glossary.extend(candidates[en_id])
+		return glossary
+
+
+def buildGlossary(_pairs, _korean_mode=KOREAN_EOJEOL, _min_count=MIN_COUNT, _top_k=TOP_K, _workers=WORKERS):
+	'''
+	_pairs : [(English subtitle, Korean subtitle)]
+	'''
+	builder = GlossaryBuilder()
+	jobs = [(first, second, _korean_mode) for first, second in _pairs]
+	pool = multiprocessing.Pool(_workers)
+	try:
+		for tokens in pool.imap_unordered(tokenizeFilm, jobs, chunksize=4):
+			for en, ko in tokens:
+				builder.addPair(en, ko)
+	finally:
+		pool.close()
+		pool.join()
+	logging.info("[GLOSSARY] %d aligned pairs, %d english terms, %d korean terms" % (builder.n_pairs_, len(builder.en_vocab_), len(builder.ko_vocab_)))
+	return builder.build(_min_count, _top_k)
+
+
+def writeGlossary(_output_filename, _glossary):
+	with codecs.open(_output_filename, 'w', encoding='utf-8') as f:
+		f.write(u'english\tkorean\tcount\tdice\tpmi\n')
+		for en, ko, count, dice, pmi in _glossary:
+			f.write(u'%s\t%s\t%d\t%.4f\t%.4f\n' % (en, ko, count, dice, pmi))
+
+
+def readPairList(_pair_list_filename):
+	# one "english subtitle<TAB>korean subtitle" per line
+	pairs = []
+	with open(_pair_list_filename) as f:
+		for line in f:
+			line = line.rstrip('\r\n')
+			if not line or line.startswith('#'):
+				continue
+			first, second = line.split('\t')[:2]
+			pairs.append((first, second))
+	return pairs
+
+
+if __name__=="__main__":
+	LearnEnglishBySubtitle.setupLogging()
+	len_of_arguments = len(sys.argv)
+
+	'''
+	sys.argv[1] : pair list (english subtitle<TAB>korean subtitle per line)
+	sys.argv[2] : output glossary (tsv)
+	sys.argv[3] : korean tokens (eojeol, syllable)
+	'''
+	if len_of_arguments < 3:
+		print("usage : %s pair_list.tsv glossary.tsv [eojeol|syllable]" % sys.argv[0])
+		sys.exit(1)
+	korean_mode = sys.argv[3] if len_of_arguments >= 4 else KOREAN_EOJEOL
+
+	glossary = buildGlossary(readPairList(sys.argv[1]), korean_mode)
+	writeGlossary(sys.argv[2], glossary)
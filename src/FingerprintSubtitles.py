@@ -0,0 +1,257 @@
+#-*- coding: utf-8 -*-
+
+'''
+Near-duplicate subtitle release detection.
+
+Every parsed track is reduced to a set of features: shingles of its quantized
+inter-cue timing (robust to a global offset and to SMI -> SRT rounding) and
+shingles of its normalized words (robust to tags, encodings and line breaks).
+The set is sketched with MinHash, and the sketches are stored in an LSH index
+(BANDS bands of ROWS rows), so a new track is only compared with the tracks
+that share a band bucket with it instead of the whole library. Tracks whose
+estimated Jaccard similarity reaches the threshold are grouped together.
+'''
+
+import os
+import re
+import sys
+import json
+import zlib
+import random
+import logging
+
+import ExtractInfoAtSubtitles
+import AlignSubtitles
+import LearnEnglishBySubtitle
+
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+THRESHOLD = 0.5
+
+# timing shingles : gaps between cue starts, in TIME_QUANTUM seconds
+TIME_QUANTUM = 0.25
+TIME_SHINGLE = 3
+WORD_SHINGLE = 3
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SEED = 1
+
+RGX_TAG = re.compile(r'<[^>]*>')
+RGX_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def makePermutations(_num_perm=NUM_PERM, _seed=SEED):
+	rand = random.Random(_seed)
+	return [(rand.randint(1, MERSENNE_PRIME - 1), rand.randint(0, MERSENNE_PRIME - 1)) for _ in range(_num_perm)]
+
+PERMUTATIONS = makePermutations()
+
+
+def featuresOf(_subs):
+	cues = AlignSubtitles.cuesOf(_subs)
+	features = set()
+
+	starts = sorted(int(round(start / TIME_QUANTUM)) for start, end, text in cues)
+	gaps = [b - a for a, b in zip(starts, starts[1:])]
+	for idx in range(len(gaps) - TIME_SHINGLE + 1):
+		features.add('t:' + ','.join(str(gap) for gap in gaps[idx:idx + TIME_SHINGLE]))
+
+	words = []
+	for start, end, text in cues:
+		words.extend(RGX_WORD.findall(RGX_TAG.sub(u' ', text).lower()))
+	for idx in range(len(words) - WORD_SHINGLE + 1):
+		features.add((u'w:' + u' '.join(words[idx:idx + WORD_SHINGLE])).encode('utf-8'))
+	return features
+
+
+def minHash(_features):
+	hashes = [zlib.crc32(feature) & MAX_HASH for feature in _features]
+	if not hashes:
+		return [MAX_HASH] * len(PERMUTATIONS)
+	return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in PERMUTATIONS]
+
+
+def signatureOf(_subs):
+	return minHash(featuresOf(_subs))
+
+
+def trackNameOf(_subtitle):
+	st = os.stat(_subtitle)
+	return '%s\t%d\t%r' % (_subtitle, st.st_size, st.st_mtime)
+
+
+def similarity(_f_signature, _s_signature):
+	# estimated Jaccard similarity
+	same = sum(1 for f, s in zip(_f_signature, _s_signature) if f == s)
+	return float(same) / len(_f_signature)
+
+
+class FingerprintIndex:
+	def __init__(self, _index_filename=None, _threshold=THRESHOLD):
+		self.index_filename_ = _index_filename
+		self.threshold_ = _threshold
+		# name ("path<TAB>size<TAB>mtime" for files) -> MinHash signature
+		self.signatures_ = {}
+		# name -> name of its group (union-find)
+		self.groups_ = {}
+		# one dict per band : band hash -> [name]
+		self.buckets_ = [dict() for _ in range(BANDS)]
+		# "first group<NEWLINE>second group" -> [first, second] of an aligned pair
+		self.pairs_ = {}
+		# whether there is anything new to save
+		self.changed_ = False
+		if self.index_filename_ is not None:
+			self.load()
+
+	def load(self):
+		try:
+			with open(self.index_filename_) as f:
+				saved = json.load(f)
+		except (IOError, ValueError):
+			return
+		for name, signature in saved['signatures'].items():
+			self.addSignature(name, signature)
+		self.groups_.update(saved['groups'])
+		self.pairs_.update(saved.get('pairs', {}))
+
+	def save(self):
+		if self.index_filename_ is None or not self.changed_:
+			return
+		temp_filename = self.index_filename_ + '.tmp'
+		with open(temp_filename, 'w') as f:
+			json.dump({'signatures': self.signatures_, 'groups': self.groups_, 'pairs': self.pairs_}, f)
+		os.rename(temp_filename, self.index_filename_)
+		self.changed_ = False
+
+	def bandsOf(self, _signature):
+		for band in range(BANDS):
+			yield band, tuple(_signature[band * ROWS:(band + 1) * ROWS])
+
+	def addSignature(self, _name, _signature):
+		self.signatures_[_name] = _signature
+		self.groups_.setdefault(_name, _name)
+		for band, key in self.bandsOf(_signature):
+			self.buckets_[band].setdefault(key, []).append(_name)
+
+	def query(self, _signature):
+		'''
+		Returns [(name, similarity)] of the indexed tracks similar to _signature.
+		'''
+		candidates = set()
+		for band, key in self.bandsOf(_signature):
+			candidates.update(self.buckets_[band].get(key, ()))
+		matches = []
+		for name in candidates:
+			sim = similarity(_signature, self.signatures_[name])
+			if sim >= self.threshold_:
+				matches.append((name, sim))
+		matches.sort(key=lambda x: -x[1])
+		return matches
+
+	def groupOf(self, _name):
+		group = self.groups_.get(_name, _name)
+		while group != self.groups_.get(group, group):
+			group = self.groups_[group]
+		return group
+
+	def mergeGroup(self, _other, _group):
+		'''
+		Merge the group _other into _group, and move the pairs recorded under _other
+		so that they are still found.
+		'''
+		self.groups_[_other] = _group
+		for key in list(self.pairs_):
+			first, second = key.split('\n')
+			if _other not in (first, second):
+				continue
+			first = _group if first == _other else first
+			second = _group if second == _other else second
+			self.pairs_.setdefault(first + '\n' + second, self.pairs_[key])
+			del self.pairs_[key]
+
+	def add(self, _name, _subs):
+		'''
+		Index a parsed track and return the name of its group; the group is the
+		track itself unless it duplicates an indexed track.
+		'''
+		if _name in self.signatures_:
+			return self.groupOf(_name)
+		signature = signatureOf(_subs)
+		matches = self.query(signature)
+		self.addSignature(_name, signature)
+		self.changed_ = True
+		if not matches:
+			return _name
+
+		group = self.groupOf(matches[0][0])
+		self.groups_[_name] = group
+		for name, sim in matches[1:]:
+			other = self.groupOf(name)
+			if other != group:
+				self.mergeGroup(other, group)
+		logging.info("[FINGERPRINT] %s duplicates %s (%.2f)" % (_name, matches[0][0], matches[0][1]))
+		return group
+
+	def addFile(self, _subtitle):
+		'''
+		Index a subtitle file and return its group. A file is indexed by its path
+		with its size and mtime, so a file replaced under the same path is a new track.
+		'''
+		name = trackNameOf(_subtitle)
+		if name in self.signatures_:
+			return self.groupOf(name)
+		return self.add(name, ExtractInfoAtSubtitles.InfoOfSubtitle(_subtitle).subs_)
+
+	def pairKeyOf(self, _first_subtitle, _second_subtitle):
+		return self.addFile(_first_subtitle) + '\n' + self.addFile(_second_subtitle)
+
+	def findPair(self, _first_subtitle, _second_subtitle):
+		'''
+		Returns the aligned [first, second] pair this pair duplicates, or None.
+		A pair is never a duplicate of itself.
+		'''
+		pair = self.pairs_.get(self.pairKeyOf(_first_subtitle, _second_subtitle))
+		if pair is None or pair == [_first_subtitle, _second_subtitle]:
+			return None
+		return pair
+
+	def addPair(self, _first_subtitle, _second_subtitle):
+		'''
+		Record a pair once it has been aligned, so later duplicates of it are skipped.
+		'''
+		key = self.pairKeyOf(_first_subtitle, _second_subtitle)
+		if key not in self.pairs_:
+			self.pairs_[key] = [_first_subtitle, _second_subtitle]
+			self.changed_ = True
+
+	def isDuplicate(self, _name):
+		return self.groupOf(_name) != _name
+
+	def duplicateGroups(self):
+		groups = {}
+		for name in self.signatures_:
+			groups.setdefault(self.groupOf(name), []).append(name)
+		return [sorted(names) for names in groups.values() if len(names) > 1]
+
+
+if __name__=="__main__":
+	LearnEnglishBySubtitle.setupLogging()
+	len_of_arguments = len(sys.argv)
+
+	'''
+	sys.argv[1] : index file
+	sys.argv[2:] : subtitles to check and add
+	'''
+	if len_of_arguments < 3:
+		print("usage : %s index.json subtitle [subtitle ...]" % sys.argv[0])
+		sys.exit(1)
+
+	index = FingerprintIndex(sys.argv[1])
+	for subtitle in sys.argv[2:]:
+		name = trackNameOf(subtitle)
+		group = index.addFile(subtitle)
+		if group != name:
+			print("%s\tduplicate of\t%s" % (subtitle, group.split('\t')[0]))
+	index.save()
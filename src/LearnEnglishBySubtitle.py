@@ -3,36 +3,54 @@
 # ts : timestamp
 
 import sys
-reload(sys)
-sys.setdefaultencoding('utf-8')
-
 import os
 from operator import eq
 
 import logging
-logging.basicConfig(filename='python_logging.log', level=logging.DEBUG)
 import ExtractInfoAtSubtitles
+import SubtitleFormats
+import AlignSubtitles
+
+# alignment mode
+ALIGN_OVERLAP = "overlap"
+ALIGN_BANDED = "banded"
+ALIGN_MODES = (ALIGN_OVERLAP, ALIGN_BANDED)
+
+LOG_FILENAME = 'python_logging.log'
+
+
+def setupLogging():
+	# only for command line runs : importing this module must not touch the log file
+	logging.basicConfig(filename=LOG_FILENAME, level=logging.DEBUG)
+
+
+def isSupportedAlignMode(_align_mode):
+	if _align_mode in ALIGN_MODES :
+		return True
+	logging.error("\n Alignment mode : " + str(_align_mode) + " IS NOT SUPPORT (" + ", ".join(ALIGN_MODES) + ")")
+	return False
+
 
 ## Find Extension Format
 def isSupportedExtension(_str_extension):
 	str_lower_extension = _str_extension.lower()
 	logging.info("Input extension : " + str_lower_extension)
-	ret_val = False
-	if eq(str_lower_extension, ".smi") or eq(str_lower_extension, ".sami") :
-		ret_val = True
-	elif eq(str_lower_extension, ".srt") :
-		ret_val = True
-	return ret_val
+	return SubtitleFormats.isSupportedExtension(str_lower_extension)
 
 
 def findExtension(_str_subtitle):
-	# find extension of input 
-	filename, extension = os.path.splitext(_str_subtitle)
+	# find format of input (by extension, or by content if the extension is unknown)
+	try:
+		subtitle_format = SubtitleFormats.formatOf(_str_subtitle)
+	except (IOError, OSError):
+		subtitle_format = None
 
 	# is support now?
-	is_support = isSupportedExtension(extension)
-	if is_support :
-		return extension
+	if subtitle_format is not None :
+		filename, extension = os.path.splitext(_str_subtitle)
+		if isSupportedExtension(extension) :
+			return extension
+		return subtitle_format.extensions_[0]
 	else :
 		logging.error("\n Filename : " + _str_subtitle + " IS NOT SUPPORT")
 		return ""
@@ -42,13 +60,19 @@ def deltatime_2_timestamp(_deltatime):
 	return _deltatime.total_seconds() + (_deltatime.microseconds / 1000000)
 
 
+def formatSrt(_ndx, _srt):
+	# N-way rows (MultiAlignSubtitles) have one line per track
+	if 'contents' in _srt:
+		return '%d\n%s --> %s\n%s\n\n' % (_ndx, _srt['left_ts'], _srt['right_ts'], '\n'.join(_srt['contents']))
+	return '%d\n%s --> %s\n%s\n%s\n\n' % (_ndx, _srt['left_ts'], _srt['right_ts'], _srt['f_contents'], _srt['s_contents'])
+
+
 def writeSrt(_output_filename, _srt_info):	
 	ndx = 1
 	with open(_output_filename, 'w') as f:
 		# write (SRT format)
 		for srt in _srt_info:	
-			str_srt = '%d\n%s --> %s\n%s\n%s\n\n' % (ndx, srt['left_ts'], srt['right_ts'], srt['f_contents'], srt['s_contents'])
-			f.write(str_srt)
+			f.write(formatSrt(ndx, srt))
 			ndx += 1
 
 
@@ -74,12 +98,94 @@ def getMaxSetReturn(_f, _s, _f_value, _s_value):
 	return _f_value if _f >= _s else _s_value
 
 
-def doWork(_first_subtitle, _second_subtitle, _output_filename):
+def matchByOverlap(_first_subs, _second_subs):
+	all_matched_list = []
+	for f_idx, f_val in enumerate(_first_subs):
+		# logging.debug("[IDX] : {%04d}, [START] : {%05d, %06d}, [END] : {%05d, %06d}\n" % (f_idx, f_val.start_timedelta_.total_seconds(), f_val.start_timedelta_.microseconds, f_val.end_timedelta_.total_seconds(), f_val.end_timedelta_.microseconds))
+		# td : timedelta
+		f_start_td = deltatime_2_timestamp(f_val.start_timedelta_) 
+		f_end_td = deltatime_2_timestamp(f_val.end_timedelta_) 
+		f_contents = AlignSubtitles.textOf(f_val.contents_).encode('utf-8')
+
+		matched_row_list = []
+		for s_idx, s_val in enumerate(_second_subs):
+			s_start_td = deltatime_2_timestamp(s_val.start_timedelta_) 
+			s_end_td = deltatime_2_timestamp(s_val.end_timedelta_) 
+
+			# get start (end) of matched timestamp
+			l_ts = f_start_td if f_start_td >= s_start_td else s_start_td
+			r_ts = f_end_td if f_end_td <= s_end_td else s_end_td
+			if l_ts < r_ts :
+				s_contents = AlignSubtitles.textOf(s_val.contents_).encode('utf-8')
+				logging.info("[1] : {%.3f} {%.3f} {%.3f} {%.3f}, {%.3f} {%.3f} {%s} {%s}" % (f_start_td, f_end_td, s_start_td, s_end_td, l_ts, r_ts, f_contents, s_contents))
+				matched_row = {	"f_start": f_start_td,
+								"f_end": f_end_td,
+								"s_start": s_start_td,
+								"s_end": s_end_td,
+								"left_ts": l_ts, 
+								"right_ts": r_ts, 
+								"f_contents": f_contents, 
+								"s_contents": s_contents
+								}
+				matched_row_list.append(matched_row)
+		'''
+		# if need merge
+		arrange_matched = []
+		if len(matched_row_list) >= 2:
+			is_merged = False
+			for idx in range(len(matched_row_list)):
+				if idx != len(matched_row_list) - 1 and not is_merged :
+					left_ts = getMin(matched_row_list[idx]['f_start'], matched_row_list[idx]['s_start'])
+					left_ts = getMin(left_ts, matched_row_list[idx + 1]['s_start'])
+
+					right_ts = getMax(matched_row_list[idx]['f_end'], matched_row_list[idx]['s_end'])
+					right_ts = getMax(right_ts, matched_row_list[idx + 1]['s_end'])
+
+					print('\n')
+					print(matched_row_list[idx]['f_contents'])
+					print(matched_row_list[idx]['s_contents'])
+					print(matched_row_list[idx + 1]['s_contents'])
+					matched_row = {
+									"left_ts": left_ts,
+									"right_ts": right_ts,
+									"f_contents": str(unicode(matched_row_list[idx]['f_contents'])),
+									"s_contents": str(unicode(matched_row_list[idx]['s_contents'] + matched_row_list[idx + 1]['s_contents']))
+									}
+					is_merged = True
+					arrange_matched.append(matched_row)
+				else:
+					if not is_merged:
+						arrange_matched.append(matched_row_list[idx])
+						is_merged = False
+				# print(idx)
+		'''
+		# if exist matched times
+		if len(matched_row_list) > 0:
+			for idx in matched_row_list:
+				all_matched_list.append(idx)
+
+	return all_matched_list
+
+
+def doWork(_first_subtitle, _second_subtitle, _output_filename, _align_mode=ALIGN_OVERLAP, _band_width=AlignSubtitles.BAND_WIDTH, _cache=None):
+	if not isSupportedAlignMode(_align_mode) :
+		return
+
 	first_extension = findExtension(_first_subtitle)
 	second_extension = findExtension(_second_subtitle)
 
 	### is supported format?
-	if not eq(first_extension, "") or not eq(second_extension, "") :	
+	if not eq(first_extension, "") and not eq(second_extension, "") :	
+		# cached result?
+		if _cache is not None :
+			# the band width only matters to banded alignment
+			if eq(_align_mode, ALIGN_BANDED) :
+				cache_key = _cache.makeKey(_first_subtitle, _second_subtitle, _align_mode, _band_width)
+			else :
+				cache_key = _cache.makeKey(_first_subtitle, _second_subtitle, _align_mode)
+			if _cache.lookup(cache_key, _output_filename) :
+				return
+
 		logging.info('\n\n')
 		logging.info(" FIRST SUBTITLE \n")
 		first_sub = ExtractInfoAtSubtitles.InfoOfSubtitle(_first_subtitle)
@@ -90,75 +196,21 @@ def doWork(_first_subtitle, _second_subtitle, _output_filename):
 		second_sub = ExtractInfoAtSubtitles.InfoOfSubtitle(_second_subtitle)
 		logging.debug(second_sub.subs_)
 
-		# Compare
-		all_matched_list = []
-		for f_idx, f_val in enumerate(first_sub.subs_):
-			# logging.debug("[IDX] : {%04d}, [START] : {%05d, %06d}, [END] : {%05d, %06d}\n" % (f_idx, f_val.start_timedelta_.total_seconds(), f_val.start_timedelta_.microseconds, f_val.end_timedelta_.total_seconds(), f_val.end_timedelta_.microseconds))
-			# td : timedelta
-			f_start_td = deltatime_2_timestamp(f_val.start_timedelta_) 
-			f_end_td = deltatime_2_timestamp(f_val.end_timedelta_) 
-
-			matched_row_list = []
-			for s_idx, s_val in enumerate(second_sub.subs_):
-				s_start_td = deltatime_2_timestamp(s_val.start_timedelta_) 
-				s_end_td = deltatime_2_timestamp(s_val.end_timedelta_) 
-
-				# get start (end) of matched timestamp
-				l_ts = f_start_td if f_start_td >= s_start_td else s_start_td
-				r_ts = f_end_td if f_end_td <= s_end_td else s_end_td
-				if l_ts < r_ts :
-					logging.info("[1] : {%.3f} {%.3f} {%.3f} {%.3f}, {%.3f} {%.3f} {%s} {%s}" % (f_start_td, f_end_td, s_start_td, s_end_td, l_ts, r_ts, str(unicode(f_val.contents_)), str(unicode(s_val.contents_))))
-					matched_row = {	"f_start": f_start_td,
-									"f_end": f_end_td,
-									"s_start": s_start_td,
-									"s_end": s_end_td,
-									"left_ts": l_ts, 
-									"right_ts": r_ts, 
-									"f_contents": str(unicode(f_val.contents_)), 
-									"s_contents": str(unicode(s_val.contents_))
-									}
-					matched_row_list.append(matched_row)
-			'''
-			# if need merge
-			arrange_matched = []
-			if len(matched_row_list) >= 2:
-				is_merged = False
-				for idx in range(len(matched_row_list)):
-					if idx != len(matched_row_list) - 1 and not is_merged :
-						left_ts = getMin(matched_row_list[idx]['f_start'], matched_row_list[idx]['s_start'])
-						left_ts = getMin(left_ts, matched_row_list[idx + 1]['s_start'])
-
-						right_ts = getMax(matched_row_list[idx]['f_end'], matched_row_list[idx]['s_end'])
-						right_ts = getMax(right_ts, matched_row_list[idx + 1]['s_end'])
-
-						print('\n')
-						print(matched_row_list[idx]['f_contents'])
-						print(matched_row_list[idx]['s_contents'])
-						print(matched_row_list[idx + 1]['s_contents'])
-						matched_row = {
-										"left_ts": left_ts,
-										"right_ts": right_ts,
-										"f_contents": str(unicode(matched_row_list[idx]['f_contents'])),
-										"s_contents": str(unicode(matched_row_list[idx]['s_contents'] + matched_row_list[idx + 1]['s_contents']))
-										}
-						is_merged = True
-						arrange_matched.append(matched_row)
-					else:
-						if not is_merged:
-							arrange_matched.append(matched_row_list[idx])
-							is_merged = False
-					# print(idx)
-			'''
-			# if exist matched times
-			if len(matched_row_list) > 0:
-				for idx in matched_row_list:
-					all_matched_list.append(idx)
+		if eq(_align_mode, ALIGN_BANDED) :
+			all_matched_list = AlignSubtitles.alignBanded(first_sub.subs_, second_sub.subs_, _band_width)
+		else :
+			all_matched_list = matchByOverlap(first_sub.subs_, second_sub.subs_)
 
 		# write srt
 		writeSrt(_output_filename, all_matched_list)
+
+		if _cache is not None :
+			_cache.store(cache_key, _output_filename)
 		
 
 if __name__=="__main__":
+	setupLogging()
+
 	# get length of arguments
 	len_of_arguments = len(sys.argv)
 
@@ -166,6 +218,12 @@ if __name__=="__main__":
 	sys.argv[1] : first subtitle
 	sys.argv[2] : second subtitle
 	sys.argv[3] : output filename
+	sys.argv[4] : alignment mode (overlap, banded)
+	sys.argv[5] : band width of banded alignment
+
+	SUBTITLE_CACHE_DIR : enables the result cache in this directory
+	SUBTITLE_CACHE_MAX_SIZE : maximum size of the result cache (bytes)
+	SUBTITLE_CACHE_BYPASS : if set, do not read or write the result cache
 	'''
 	logging.info("[INPUT ARGUMENTS]")
 	for idx in range(len_of_arguments):
@@ -189,7 +247,30 @@ if __name__=="__main__":
 	else:
 		output_filename = sys.argv[3]
 
-	doWork(first_subtitle, second_subtitle, output_filename)
+	if len_of_arguments < 5:
+		align_mode = ALIGN_OVERLAP
+	else:
+		align_mode = sys.argv[4]
+		if not isSupportedAlignMode(align_mode) :
+			sys.stderr.write("unknown alignment mode : %s (%s)\n" % (align_mode, ", ".join(ALIGN_MODES)))
+			sys.exit(1)
+
+	if len_of_arguments < 6:
+		band_width = AlignSubtitles.BAND_WIDTH
+	else:
+		band_width = int(sys.argv[5])
+
+	cache = None
+	if os.environ.get("SUBTITLE_CACHE_DIR") :
+		import AlignmentCache
+		cache = AlignmentCache.AlignmentCache(os.environ["SUBTITLE_CACHE_DIR"],
+			int(os.environ.get("SUBTITLE_CACHE_MAX_SIZE", AlignmentCache.DEFAULT_MAX_SIZE)),
+			bool(os.environ.get("SUBTITLE_CACHE_BYPASS")))
+
+	doWork(first_subtitle, second_subtitle, output_filename, align_mode, band_width, cache)
+
+	if cache is not None :
+		logging.info("[CACHE] " + str(cache.stats()))
 
 
 
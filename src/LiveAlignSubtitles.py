@@ -0,0 +1,232 @@
+#-*- coding: utf-8 -*-
+
+'''
+Real-time alignment of two live caption streams.
+
+Each input (stdin "-", a FIFO or file path, "unix:/path" or "tcp:host:port")
+carries SRT blocks. Blocks are parsed as they complete with srt_github, and
+every side keeps only the cues that may still overlap a future cue of the
+other side. A matched pair is emitted once both streams have moved past its
+end time, or once it has been held for `_max_hold` seconds, whichever comes
+first. A side also drops the cues that end WINDOW_HORIZON seconds behind its
+own latest cue once they have been held for `_max_hold` seconds, so its window
+stays bounded while the other side is silent.
+End-to-end latency (arrival of the later cue -> emission) is sampled into a
+bounded reservoir and reported as percentiles.
+'''
+
+import sys
+import time
+import heapq
+import random
+import socket
+import logging
+import threading
+try:
+	import Queue as queue
+except ImportError:
+	import queue
+
+import srt_github
+import AlignSubtitles
+import LearnEnglishBySubtitle
+from LearnEnglishBySubtitle import formatSrt
+
+MAX_HOLD = 2.0
+TICK = 0.05
+# stream seconds a cue is kept behind the latest cue of its own side
+WINDOW_HORIZON = 30.0
+# latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+PERCENTILES = (50, 90, 99)
+
+FIRST = 0
+SECOND = 1
+END_OF_STREAM = float('inf')
+
+
+def openStream(_spec):
+	if _spec == '-':
+		return sys.stdin
+	if _spec.startswith('unix:'):
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		sock.connect(_spec[len('unix:'):])
+		return sock.makefile('rb')
+	if _spec.startswith('tcp:'):
+		host, port = _spec[len('tcp:'):].rsplit(':', 1)
+		sock = socket.create_connection((host, int(port)))
+		return sock.makefile('rb')
+	return open(_spec, 'rb')
+
+
+def parseBlock(_lines):
+	block = u''.join(_lines).lstrip(u'\ufeff').strip(u'\r\n') + u'\n'
+	try:
+		return list(srt_github.parse(block))
+	except srt_github.SRTParseError:
+		logging.warning("[LIVE] cannot parse block : " + repr(block))
+		return []
+
+
+def readStream(_side, _stream, _events):
+	'''
+	Split the stream into SRT blocks at blank lines and post (side, cue, arrival)
+	for every parsed cue, then (side, None, arrival) at the end of the stream.
+	'''
+	lines = []
+	for raw_line in iter(_stream.readline, b''):
+		if not raw_line:
+			break
+		line = raw_line.decode('utf-8', 'replace') if isinstance(raw_line, bytes) else raw_line
+		if line.strip():
+			lines.append(line)
+			continue
+		if lines:
+			for sub in parseBlock(lines):
+				_events.put((_side, sub, time.time()))
+			lines = []
+	if lines:
+		for sub in parseBlock(lines):
+			_events.put((_side, sub, time.time()))
+	_events.put((_side, None, time.time()))
+
+
+def percentile(_sorted_values, _percent):
+	if not _sorted_values:
+		return 0.0
+	idx = int(round((len(_sorted_values) - 1) * _percent / 100.0))
+	return _sorted_values[idx]
+
+
+class LiveAligner:
+	def __init__(self, _output=sys.stdout, _max_hold=MAX_HOLD):
+		self.output_ = _output
+		self.max_hold_ = _max_hold
+		# open cues of each side : [(start, end, text, arrival)]
+		self.windows_ = ([], [])
+		# latest start time seen on each side (stream time)
+		self.watermarks_ = [0.0, 0.0]
+		# pending pairs : (right_ts, left_ts, seq, row, arrival)
+		self.pending_ = []
+		self.seq_ = 0
+		self.ndx_ = 1
+		# reservoir sample of the latencies of the n_pairs_ emitted pairs
+		self.latencies_ = []
+		self.n_pairs_ = 0
+		self.random_ = random.Random()
+
+	def addCue(self, _side, _sub, _arrival):
+		start = AlignSubtitles.deltatime_2_timestamp(_sub.start_timedelta_)
+		end = AlignSubtitles.deltatime_2_timestamp(_sub.end_timedelta_)
+		cue = (start, end, AlignSubtitles.textOf(_sub.contents_), _arrival)
+		if start > self.watermarks_[_side]:
+			self.watermarks_[_side] = start
+
+		other = 1 - _side
+		for o_cue in self.windows_[other]:
+			l_ts = start if start >= o_cue[0] else o_cue[0]
+			r_ts = end if end <= o_cue[1] else o_cue[1]
+			if l_ts >= r_ts:
+				continue
+			f_cue, s_cue = (cue, o_cue) if _side == FIRST else (o_cue, cue)
+			row = AlignSubtitles.makeMatchedRow(f_cue[:3], s_cue[:3])
+			heapq.heappush(self.pending_, (row['right_ts'], row['left_ts'], self.seq_, row, _arrival))
+			self.seq_ += 1
+		self.windows_[_side].append(cue)
+		self.evict(_arrival)
+
+	def endOfStream(self, _side, _now):
+		self.watermarks_[_side] = END_OF_STREAM
+		self.evict(_now)
+
+	def evict(self, _now):
+		# a cue can not overlap a future cue of the other side once that side has passed its end,
+		# and is not waited for once it is WINDOW_HORIZON behind its own side and held too long
+		held = _now - self.max_hold_
+		for side in (FIRST, SECOND):
+			other_watermark = self.watermarks_[1 - side]
+			# an ended side keeps its cues for the rest of the other side
+			horizon = self.watermarks_[side] - WINDOW_HORIZON if self.watermarks_[side] != END_OF_STREAM else -END_OF_STREAM
+			self.windows_[side][:] = [cue for cue in self.windows_[side] if cue[1] > other_watermark and (cue[1] > horizon or cue[3] > held)]
+
+	def addLatency(self, _latency):
+		self.n_pairs_ += 1
+		if len(self.latencies_) < LATENCY_SAMPLES:
+			self.latencies_.append(_latency)
+			return
+		idx = self.random_.randrange(self.n_pairs_)
+		if idx < LATENCY_SAMPLES:
+			self.latencies_[idx] = _latency
+
+	def flush(self, _now):
+		self.evict(_now)
+		watermark = min(self.watermarks_)
+		ready = []
+		held = []
+		while self.pending_:
+			if self.pending_[0][0] <= watermark:
+				ready.append(heapq.heappop(self.pending_))
+			else:
+				break
+		# pairs held too long are emitted even though a side has not moved past them
+		for item in self.pending_:
+			if _now - item[4] >= self.max_hold_:
+				held.append(item)
+		if held:
+			self.pending_ = [item for item in self.pending_ if _now - item[4] < self.max_hold_]
+			heapq.heapify(self.pending_)
+
+		for item in sorted(ready + held, key=lambda x: (x[1], x[2])):
+			self.output_.write(formatSrt(self.ndx_, item[3]))
+			self.ndx_ += 1
+			self.addLatency(_now - item[4])
+		if ready or held:
+			self.output_.flush()
+
+	def latencyReport(self):
+		values = sorted(self.latencies_)
+		return dict(('p%d' % p, percentile(values, p)) for p in PERCENTILES)
+
+
+def runLive(_first_spec, _second_spec, _output=sys.stdout, _max_hold=MAX_HOLD):
+	events = queue.Queue()
+	for side, spec in ((FIRST, _first_spec), (SECOND, _second_spec)):
+		reader = threading.Thread(target=readStream, args=(side, openStream(spec), events))
+		reader.daemon = True
+		reader.start()
+
+	aligner = LiveAligner(_output, _max_hold)
+	open_sides = 2
+	while open_sides > 0 or aligner.pending_:
+		try:
+			side, sub, arrival = events.get(timeout=TICK)
+			if sub is None:
+				aligner.endOfStream(side, arrival)
+				open_sides -= 1
+			else:
+				aligner.addCue(side, sub, arrival)
+		except queue.Empty:
+			pass
+		aligner.flush(time.time())
+
+	report = aligner.latencyReport()
+	logging.info("[LIVE] %d pairs, latency %s" % (aligner.n_pairs_, report))
+	return report
+
+
+if __name__=="__main__":
+	LearnEnglishBySubtitle.setupLogging()
+	len_of_arguments = len(sys.argv)
+
+	'''
+	sys.argv[1] : first caption stream (-, path / fifo, unix:/path, tcp:host:port)
+	sys.argv[2] : second caption stream
+	sys.argv[3] : maximum hold latency (seconds)
+	'''
+	if len_of_arguments < 3:
+		print("usage : %s first_stream second_stream [max_hold]" % sys.argv[0])
+		sys.exit(1)
+	max_hold = float(sys.argv[3]) if len_of_arguments >= 4 else MAX_HOLD
+
+	report = runLive(sys.argv[1], sys.argv[2], sys.stdout, max_hold)
+	sys.stderr.write("latency (s) : " + ", ".join("%s %.3f" % (k, report[k]) for k in sorted(report)) + "\n")
@@ -0,0 +1,117 @@
+#-*- coding: utf-8 -*-
+
+'''
+N-way alignment of subtitle tracks in a single k-way sweep.
+
+The cue boundaries of every track are merged with a heap (heapq.merge), so the
+sweep costs O(total cues * log k) for k tracks whose cues are in time order
+and do not overlap (a track that is not gets sorted first). Between two
+consecutive boundaries the set of active cues does not change; every such
+elementary segment with enough active tracks becomes one row holding the
+active cue of each track (one line per track, SILENT_LINE for a silent track,
+since a blank line would end the SRT block). Adjacent segments with
+the same active cues are merged and slivers shorter than MIN_DURATION dropped.
+'''
+
+import sys
+import heapq
+import logging
+
+import ExtractInfoAtSubtitles
+import AlignSubtitles
+import LearnEnglishBySubtitle
+from LearnEnglishBySubtitle import writeSrt
+
+MIN_TRACKS = 2
+# shorter segments (e.g. 10ms of SMI end time rounding) are dropped
+MIN_DURATION = 0.05
+# line of a track without an active cue
+SILENT_LINE = '-'
+
+# at the same time, ends are handled before starts
+END = 0
+START = 1
+
+
+def boundariesOf(_track, _cues):
+	'''
+	(time, END/START, track, cue index) of one track, in time order
+	'''
+	events = []
+	for idx, (start, end, text) in enumerate(_cues):
+		if start >= end:
+			continue
+		events.append((start, START, _track, idx))
+		events.append((end, END, _track, idx))
+	# subtitles are normally sorted and do not overlap : only sort when they are not
+	for idx in range(1, len(events)):
+		if events[idx] < events[idx - 1]:
+			events.sort()
+			break
+	return events
+
+
+def alignTracks(_tracks_subs, _min_tracks=MIN_TRACKS, _min_duration=MIN_DURATION):
+	'''
+	_tracks_subs : [[Subtitle]] of every track
+	Returns rows {"left_ts", "right_ts", "contents": [text of each track]}.
+	'''
+	tracks_cues = [AlignSubtitles.cuesOf(subs) for subs in _tracks_subs]
+	n_tracks = len(tracks_cues)
+	# one line per track
+	tracks_lines = [[u' '.join(text.split()) for start, end, text in cues] for cues in tracks_cues]
+
+	# active cues of each track; the latest started one is shown
+	active = [[] for _ in range(n_tracks)]
+	n_active_tracks = 0
+
+	rows = []
+	prev_time = None
+	# active cues of the last row, None once a segment that is not a sliver ends it
+	prev_key = None
+	for time, kind, track, idx in heapq.merge(*[boundariesOf(t, cues) for t, cues in enumerate(tracks_cues)]):
+		if prev_time is not None and time > prev_time:
+			key = tuple(cues[-1] if cues else -1 for cues in active)
+			if n_active_tracks < _min_tracks:
+				if time - prev_time >= _min_duration:
+					prev_key = None
+			elif key == prev_key:
+				# only dropped slivers lie between : extend the last row over them
+				rows[-1]['right_ts'] = time
+			elif time - prev_time >= _min_duration:
+				contents = [(tracks_lines[t][key[t]] if key[t] >= 0 else u'').encode('utf-8') or SILENT_LINE for t in range(n_tracks)]
+				rows.append({"left_ts": prev_time, "right_ts": time, "contents": contents})
+				prev_key = key
+		prev_time = time
+
+		if kind == START:
+			if not active[track]:
+				n_active_tracks += 1
+			active[track].append(idx)
+		else:
+			active[track].remove(idx)
+			if not active[track]:
+				n_active_tracks -= 1
+
+	logging.info("[MULTI] %d tracks, %d cues, %d segments" % (n_tracks, sum(len(cues) for cues in tracks_cues), len(rows)))
+	return rows
+
+
+def doMultiWork(_subtitles, _output_filename, _min_tracks=MIN_TRACKS, _min_duration=MIN_DURATION):
+	tracks_subs = [ExtractInfoAtSubtitles.InfoOfSubtitle(subtitle).subs_ for subtitle in _subtitles]
+	writeSrt(_output_filename, alignTracks(tracks_subs, _min_tracks, _min_duration))
+
+
+if __name__=="__main__":
+	LearnEnglishBySubtitle.setupLogging()
+	len_of_arguments = len(sys.argv)
+
+	'''
+	sys.argv[1] : output filename
+	sys.argv[2:] : subtitles (one line per track in the output)
+	'''
+	if len_of_arguments < 4:
+		print("usage : %s output.srt first_subtitle second_subtitle [third_subtitle ...]" % sys.argv[0])
+		sys.exit(1)
+
+	doMultiWork(sys.argv[2:], sys.argv[1])
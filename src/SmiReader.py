@@ -0,0 +1,22 @@
+#-*- coding: utf-8 -*-
+
+from srt_github import make_a_subtitle
+from smi2srt_github import convertSMI
+
+
+def readSmi(_str_subtitle):
+	with open(_str_subtitle) as f:
+		raw_text_ = f.read()
+		list_srt = convertSMI(raw_text_)
+		temp_list_srt = []
+		for idx, si in enumerate(list_srt):
+			si.convertSrt()
+			if si.contents_ == None or len(si.contents_) <= 0:
+				continue
+			tsi = make_a_subtitle(list_srt[idx].index_, 
+				list_srt[idx].start_ts_,
+				list_srt[idx].contents_,
+				list_srt[idx].end_ts_
+				)
+			temp_list_srt.append(tsi)
+		return temp_list_srt
@@ -0,0 +1,11 @@
+#-*- coding: utf-8 -*-
+
+import codecs
+
+import srt_github
+
+
+def readSrt(_str_subtitle):
+	with codecs.open(_str_subtitle, 'r', encoding="utf-8-sig") as f :
+		raw_text_ = f.read()
+		return list(srt_github.parse(raw_text_))
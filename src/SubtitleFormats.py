@@ -0,0 +1,93 @@
+#-*- coding: utf-8 -*-
+
+'''
+Registry of subtitle formats.
+
+Every format registers its extensions, a content sniffer and the module and
+function of its reader. Reader modules are only imported the first time a file
+of their format is read, so an SRT-only run never loads the SAMI converter (and
+chardet). All readers return a list of srt_github.Subtitle, the one cue
+representation used by the aligners.
+'''
+
+import os
+import re
+import logging
+import importlib
+
+
+class SubtitleFormat:
+	def __init__(self, _name, _extensions, _module_name, _function_name, _sniff=None):
+		self.name_ = _name
+		self.extensions_ = _extensions
+		self.module_name_ = _module_name
+		self.function_name_ = _function_name
+		self.sniff_ = _sniff
+		self.reader_ = None
+
+	def reader(self):
+		if self.reader_ is None:
+			module = importlib.import_module(self.module_name_)
+			self.reader_ = getattr(module, self.function_name_)
+		return self.reader_
+
+
+# registered formats, in sniffing order
+FORMATS = []
+# lower case extension -> SubtitleFormat
+EXTENSIONS = {}
+SNIFF_LENGTH = 1024
+
+
+def register(_name, _extensions, _module_name, _function_name, _sniff=None):
+	subtitle_format = SubtitleFormat(_name, _extensions, _module_name, _function_name, _sniff)
+	FORMATS.append(subtitle_format)
+	for extension in _extensions:
+		EXTENSIONS[extension.lower()] = subtitle_format
+	return subtitle_format
+
+
+def isSupportedExtension(_str_extension):
+	return _str_extension.lower() in EXTENSIONS
+
+
+def sniff(_head):
+	# skip a BOM (UTF-8 or UTF-16) and leading blank lines
+	head = _head.lstrip(b'\xef\xbb\xbf\xff\xfe').replace(b'\x00', b'').lstrip()
+	for subtitle_format in FORMATS:
+		if subtitle_format.sniff_ is not None and subtitle_format.sniff_(head):
+			return subtitle_format
+	return None
+
+
+def formatOf(_str_subtitle):
+	'''
+	The format of a subtitle file by its extension, or by its content when the
+	extension is unknown. Returns None if neither matches.
+	'''
+	filename, extension = os.path.splitext(_str_subtitle)
+	subtitle_format = EXTENSIONS.get(extension.lower())
+	if subtitle_format is not None:
+		return subtitle_format
+
+	with open(_str_subtitle, 'rb') as f:
+		return sniff(f.read(SNIFF_LENGTH))
+
+
+def readSubtitle(_str_subtitle):
+	subtitle_format = formatOf(_str_subtitle)
+	if subtitle_format is None:
+		logging.error("\n Filename : " + _str_subtitle + " IS NOT SUPPORT")
+		return []
+	return subtitle_format.reader()(_str_subtitle)
+
+
+RGX_SRT_HEAD = re.compile(br'\d+\s*\r?\n\d+:\d+:\d+[,.:]\d+ --> ')
+RGX_VTT_HEAD = re.compile(br'WEBVTT(?:[ \t\r\n]|$)')
+RGX_SAMI_HEAD = re.compile(br'<SAMI', re.IGNORECASE)
+RGX_ASS_HEAD = re.compile(br'\[Script Info\]', re.IGNORECASE)
+
+register("SRT", (".srt",), "SrtReader", "readSrt", lambda head: RGX_SRT_HEAD.match(head) is not None)
+register("WebVTT", (".vtt",), "VttReader", "readVtt", lambda head: RGX_VTT_HEAD.match(head) is not None)
+register("SAMI", (".smi", ".sami"), "SmiReader", "readSmi", lambda head: RGX_SAMI_HEAD.search(head) is not None)
+register("ASS/SSA", (".ass", ".ssa"), "AssReader", "readAss", lambda head: RGX_ASS_HEAD.match(head) is not None)
@@ -0,0 +1,67 @@
+#-*- coding: utf-8 -*-
+
+'''
+WebVTT reader.
+
+Cue identifiers, cue settings, NOTE / STYLE / REGION blocks and WebVTT only
+tags (voice, class, ruby, timestamps) are dropped; <b>, <i> and <u> are kept
+like the SAMI converter does.
+'''
+
+import re
+import codecs
+
+from srt_github import make_a_subtitle
+
+RGX_VTT_TIMING = re.compile(r'^\s*((?:\d+:)?\d{2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{2}:\d{2}\.\d{3})')
+RGX_VTT_TAG = re.compile(r'<(?!/?(?:b|i|u)>)[^>]*>')
+VTT_ENTITIES = ((u'&lt;', u'<'), (u'&gt;', u'>'), (u'&nbsp;', u' '), (u'&lrm;', u''), (u'&rlm;', u''), (u'&amp;', u'&'))
+SKIPPED_BLOCKS = (u'NOTE', u'STYLE', u'REGION', u'WEBVTT')
+
+
+def vtt_timestamp_to_srt(_ts):
+	# "mm:ss.ttt" or "hh:mm:ss.ttt" -> "hh:mm:ss,ttt"
+	parts = _ts.split(':')
+	if len(parts) == 2:
+		parts.insert(0, '0')
+	return '%02d:%s:%s' % (int(parts[0]), parts[1], parts[2].replace('.', ','))
+
+
+def cleanText(_lines):
+	text = u'\n'.join(_lines)
+	text = RGX_VTT_TAG.sub(u'', text)
+	for entity, char in VTT_ENTITIES:
+		text = text.replace(entity, char)
+	return text.strip()
+
+
+def parseVtt(_text):
+	subs = []
+	blocks = re.split(r'\r?\n(?:[ \t]*\r?\n)+', _text.replace(u'\r\n', u'\n'))
+	for block in blocks:
+		lines = block.strip(u'\n').split(u'\n')
+		if not lines or lines[0].split(u' ')[0].split(u'\t')[0] in SKIPPED_BLOCKS:
+			continue
+
+		# optional cue identifier before the timing line
+		for idx, line in enumerate(lines[:2]):
+			m = RGX_VTT_TIMING.match(line)
+			if m:
+				break
+		else:
+			continue
+
+		contents = cleanText(lines[idx + 1:])
+		if not contents:
+			continue
+		subs.append(make_a_subtitle(len(subs) + 1,
+			vtt_timestamp_to_srt(m.group(1)),
+			contents,
+			vtt_timestamp_to_srt(m.group(2))
+			))
+	return subs
+
+
+def readVtt(_str_subtitle):
+	with codecs.open(_str_subtitle, 'r', encoding="utf-8-sig") as f :
+		return parseVtt(f.read())
@@ -0,0 +1,306 @@
+#-*- coding: utf-8 -*-
+
+'''
+Watch-folder ingestion.
+
+Polls a directory tree for subtitle files, pairs them by base name and
+language suffix (e.g. "Movie.en.srt" + "Movie.ko.smi") and queues alignment
+jobs into a bounded pool of worker processes. A file is only used once its
+size and mtime have not changed for `_settle_seconds`, and a pair whose files
+have not changed since it was last aligned (recorded in the state file) is
+not reprocessed after a restart.
+'''
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import multiprocessing
+try:
+	import Queue as queue
+except ImportError:
+	import queue
+
+import LearnEnglishBySubtitle
+
+POLL_SECONDS = 2.0
+SETTLE_SECONDS = 5.0
+WORKERS = 2
+QUEUE_SIZE = 8
+# seconds a worker gets to finish its current job on stop
+STOP_TIMEOUT = 10.0
+STATE_FILENAME = '.subtitle_watch_state.json'
+OUTPUT_SUFFIX = '_output_.srt'
+
+FIRST_LANGUAGES = ('en', 'eng', 'english')
+SECOND_LANGUAGES = ('ko', 'kor', 'korean')
+
+
+def splitLanguage(_path):
+	'''
+	"dir/Movie.en.srt" -> ("dir/Movie", "en"), or None if it is not a watched subtitle
+	'''
+	if _path.endswith(OUTPUT_SUFFIX):
+		return None
+	stem, extension = os.path.splitext(_path)
+	if not extension or not LearnEnglishBySubtitle.isSupportedExtension(extension):
+		return None
+	base, language = os.path.splitext(stem)
+	language = language[1:].lower()
+	if language not in FIRST_LANGUAGES and language not in SECOND_LANGUAGES:
+		return None
+	return base, language
+
+
+def fingerprintOf(_path):
+	st = os.stat(_path)
+	return [st.st_size, st.st_mtime]
+
+
+def worker(_job_queue, _result_queue):
+	# Ctrl-C reaches the whole process group; the watcher decides when workers stop
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	while True:
+		job = _job_queue.get()
+		if job is None:
+			break
+		base, first_subtitle, second_subtitle, output_filename, fingerprint = job
+		try:
+			LearnEnglishBySubtitle.doWork(first_subtitle, second_subtitle, output_filename)
+			_result_queue.put((job, True))
+		except Exception:
+			logging.exception("[WATCH] failed : " + base)
+			_result_queue.put((job, False))
+
+
+class SubtitleWatcher:
+	def __init__(self, _watch_dir, _output_dir=None, _workers=WORKERS, _queue_size=QUEUE_SIZE, _settle_seconds=SETTLE_SECONDS, _state_filename=None, _fingerprint_index=None):
+		self.watch_dir_ = _watch_dir
+		self.output_dir_ = _output_dir
+		self.workers_ = _workers
+		self.settle_seconds_ = _settle_seconds
+		if _state_filename is None:
+			_state_filename = os.path.join(_watch_dir, STATE_FILENAME)
+		self.state_filename_ = _state_filename
+		# FingerprintSubtitles.FingerprintIndex, to skip duplicate releases
+		self.fingerprint_index_ = _fingerprint_index
+
+		# path -> [size, mtime, first seen with this size and mtime]
+		self.seen_ = {}
+		# base -> fingerprint of the finished pair
+		self.done_ = self.loadState()
+		# base -> fingerprint of the queued pair
+		self.in_flight_ = {}
+		# base -> fingerprint of the pair that failed (retried once it changes)
+		self.failed_ = {}
+
+		self.job_queue_ = multiprocessing.Queue(_queue_size)
+		self.result_queue_ = multiprocessing.Queue()
+		self.pool_ = []
+
+	def loadState(self):
+		try:
+			with open(self.state_filename_) as f:
+				return json.load(f)
+		except (IOError, ValueError):
+			return {}
+
+	def saveState(self):
+		temp_filename = self.state_filename_ + '.tmp'
+		with open(temp_filename, 'w') as f:
+			json.dump(self.done_, f)
+		os.rename(temp_filename, self.state_filename_)
+
+	def start(self):
+		for _ in range(self.workers_):
+			p = multiprocessing.Process(target=worker, args=(self.job_queue_, self.result_queue_))
+			p.daemon = True
+			p.start()
+			self.pool_.append(p)
+
+	def stop(self, _timeout=STOP_TIMEOUT):
+		# drop the queued jobs (they are picked up again on the next run) to make room for the sentinels
+		while True:
+			try:
+				job = self.job_queue_.get_nowait()
+			except queue.Empty:
+				break
+			if job is not None:
+				self.in_flight_.pop(job[0], None)
+		for _ in self.pool_:
+			try:
+				self.job_queue_.put(None, timeout=_timeout)
+			except queue.Full:
+				break
+
+		deadline = time.time() + _timeout
+		for p in self.pool_:
+			p.join(max(deadline - time.time(), 0))
+		for p in self.pool_:
+			if p.is_alive():
+				logging.warning("[WATCH] terminating worker %d" % p.pid)
+				p.terminate()
+				p.join()
+		self.collectResults()
+		self.saveFingerprints()
+		self.pool_ = []
+
+	def collectResults(self):
+		while True:
+			try:
+				job, ok = self.result_queue_.get_nowait()
+			except queue.Empty:
+				break
+			base, first_subtitle, second_subtitle, output_filename, fingerprint = job
+			self.in_flight_.pop(base, None)
+			if ok:
+				self.done_[base] = fingerprint
+				self.saveState()
+				self.recordPair(first_subtitle, second_subtitle)
+				logging.info("[WATCH] done : " + base)
+			else:
+				self.failed_[base] = fingerprint
+
+	def scan(self):
+		'''
+		Returns {base: {language: path}} of the files that have settled.
+		'''
+		now = time.time()
+		pairs = {}
+		current = set()
+		for dirpath, dirnames, filenames in os.walk(self.watch_dir_):
+			for filename in filenames:
+				path = os.path.join(dirpath, filename)
+				split = splitLanguage(path)
+				if split is None:
+					continue
+				try:
+					size, mtime = fingerprintOf(path)
+				except OSError:
+					continue
+				current.add(path)
+
+				# debounce files that are still being written
+				seen = self.seen_.get(path)
+				if seen is None or seen[0] != size or seen[1] != mtime:
+					self.seen_[path] = [size, mtime, now]
+					continue
+				if now - seen[2] < self.settle_seconds_:
+					continue
+
+				base, language = split
+				pairs.setdefault(base, {})[language] = path
+
+		for path in list(self.seen_):
+			if path not in current:
+				del self.seen_[path]
+		return pairs
+
+	def makeJob(self, _base, _languages):
+		first_subtitle = None
+		second_subtitle = None
+		for language, path in sorted(_languages.items()):
+			if language in FIRST_LANGUAGES:
+				first_subtitle = path
+			else:
+				second_subtitle = path
+		if first_subtitle is None or second_subtitle is None:
+			return None
+
+		if self.output_dir_ is None:
+			output_filename = _base + OUTPUT_SUFFIX
+		else:
+			output_filename = os.path.join(self.output_dir_, os.path.basename(_base) + OUTPUT_SUFFIX)
+		fingerprint = fingerprintOf(first_subtitle) + fingerprintOf(second_subtitle)
+		return (_base, first_subtitle, second_subtitle, output_filename, fingerprint)
+
+	def isDuplicatePair(self, _job):
+		if self.fingerprint_index_ is None:
+			return False
+		base, first_subtitle, second_subtitle = _job[:3]
+		try:
+			duplicate = self.fingerprint_index_.findPair(first_subtitle, second_subtitle)
+		except Exception:
+			logging.exception("[WATCH] cannot fingerprint : " + base)
+			return False
+		if duplicate is None:
+			return False
+		logging.info("[WATCH] skip duplicate : %s (of %s, %s)" % (base, duplicate[0], duplicate[1]))
+		return True
+
+	def saveFingerprints(self):
+		# once per poll, and only when a track or a pair was added
+		if self.fingerprint_index_ is not None:
+			self.fingerprint_index_.save()
+
+	def recordPair(self, _first_subtitle, _second_subtitle):
+		# only aligned pairs make later pairs duplicates
+		if self.fingerprint_index_ is None:
+			return
+		try:
+			self.fingerprint_index_.addPair(_first_subtitle, _second_subtitle)
+		except Exception:
+			logging.exception("[WATCH] cannot fingerprint : " + _first_subtitle + ", " + _second_subtitle)
+
+	def pollOnce(self):
+		self.collectResults()
+		queued = 0
+		for base, languages in sorted(self.scan().items()):
+			job = self.makeJob(base, languages)
+			if job is None:
+				continue
+			fingerprint = job[-1]
+			if fingerprint in (self.done_.get(base), self.in_flight_.get(base), self.failed_.get(base)):
+				continue
+			if self.isDuplicatePair(job):
+				self.done_[base] = fingerprint
+				self.saveState()
+				continue
+			try:
+				self.job_queue_.put_nowait(job)
+			except queue.Full:
+				# backpressure : leave the rest for the next poll
+				logging.info("[WATCH] queue is full, deferring : " + base)
+				break
+			self.in_flight_[base] = fingerprint
+			queued += 1
+		self.saveFingerprints()
+		return queued
+
+	def run(self, _poll_seconds=POLL_SECONDS):
+		self.start()
+		try:
+			while True:
+				self.pollOnce()
+				time.sleep(_poll_seconds)
+		finally:
+			self.stop()
+
+
+if __name__=="__main__":
+	LearnEnglishBySubtitle.setupLogging()
+	len_of_arguments = len(sys.argv)
+
+	'''
+	sys.argv[1] : watch directory
+	sys.argv[2] : output directory (default : next to the subtitles)
+	sys.argv[3] : number of workers
+	sys.argv[4] : job queue size
+	sys.argv[5] : fingerprint index file, to skip duplicate releases
+	'''
+	watch_dir = sys.argv[1] if len_of_arguments >= 2 else "../res"
+	output_dir = sys.argv[2] if len_of_arguments >= 3 else None
+	workers = int(sys.argv[3]) if len_of_arguments >= 4 else WORKERS
+	queue_size = int(sys.argv[4]) if len_of_arguments >= 5 else QUEUE_SIZE
+	fingerprint_index = None
+	if len_of_arguments >= 6:
+		from FingerprintSubtitles import FingerprintIndex
+		fingerprint_index = FingerprintIndex(sys.argv[5])
+
+	watcher = SubtitleWatcher(watch_dir, output_dir, workers, queue_size, _fingerprint_index=fingerprint_index)
+	try:
+		watcher.run()
+	except KeyboardInterrupt:
+		pass
@@ -41,7 +41,6 @@ __license__ = "GCQVista's NDA"
 import os
 import sys
 import re
-import chardet #@UnresolvedImport
 from math import floor
 from datetime import timedelta
 
@@ -133,6 +132,7 @@ def convertSMI(_smi_text):
 	#ifp = open(_smi_file)
 	#smi_sgml = ifp.read()#.upper()
 	# ifp.close()
+	import chardet #@UnresolvedImport
 	chdt = chardet.detect(_smi_text)
 	if chdt['encoding'] != 'UTF-8':
 		_smi_text = unicode(_smi_text, chdt['encoding'].lower()).encode('utf-8')
@@ -22,7 +22,7 @@ RGX_PROPRIETARY = r'[^\r\n]*'
 RGX_CONTENT = r'.*?'
 RGX_POSSIBLE_CRLF = r'\r?\n'
 
-SRT_REGEX = re.compile(
+SRT_PATTERN = (
     r'({idx})\s*{eof}({ts}) --> ({ts}) ?({proprietary}){eof}({content})'
     # Many sub editors don't add a blank line to the end, and many editors and
     # players accept that. We allow it to be missing in input.
@@ -46,9 +46,18 @@ SRT_REGEX = re.compile(
         proprietary=RGX_PROPRIETARY,
         content=RGX_CONTENT,
         eof=RGX_POSSIBLE_CRLF,
-    ),
-    re.DOTALL,
+    )
 )
+# compiled on first parse, so importing this module stays cheap
+SRT_REGEX = None
+
+
+def _srt_regex():
+    global SRT_REGEX
+    if SRT_REGEX is None:
+        SRT_REGEX = re.compile(SRT_PATTERN, re.DOTALL)
+    return SRT_REGEX
+
 TS_LEN = 12
 STANDARD_TS_COLON_OFFSET = 2
 
@@ -358,7 +367,7 @@ def parse(srt):
 
     expected_start = 0
 
-    for match in SRT_REGEX.finditer(srt):
+    for match in _srt_regex().finditer(srt):
         actual_start = match.start()
         _raise_if_not_contiguous(srt, expected_start, actual_start)
 